@@ -1,6 +1,6 @@
-import sys, os, json, threading, queue, uuid, tempfile, sounddevice as sd, soundfile as sf, numpy as np, requests, pyaudio, wave
+import sys, os, json, threading, queue, uuid, tempfile, collections, sounddevice as sd, soundfile as sf, numpy as np, requests, pyaudio, wave
 from dataclasses import dataclass, asdict
-from typing import List, Optional, Any
+from typing import List, Optional, Any, Dict, Tuple
 from PyQt5 import QtWidgets, QtCore
 from PyQt5.QtCore import Qt
 
@@ -24,6 +24,9 @@ APP_DIR = os.path.join(os.path.expanduser('~'), '.py_soundpad')
 os.makedirs(APP_DIR, exist_ok=True)
 SOUNDS_DB = os.path.join(APP_DIR, 'sounds.json')
 DEFAULT_SAMPLE_RATE = 48000
+PREFETCH_TOP_N = 12          # quantos sons "prováveis" manter decodificados
+CACHE_BUDGET_MB = 256        # limite de memória do cache de áudio decodificado
+PREFETCH_IDLE_SECONDS = 30.0 # reavalia os sons prováveis quando ocioso
 
 @dataclass
 class SoundEntry:
@@ -33,7 +36,11 @@ class SoundEntry:
     volume: float = 1.0
     hotkey: Optional[str] = None
     usage_count: int = 0
+    last_used: float = 0
     created_at: float = QtCore.QDateTime.currentSecsSinceEpoch()
+    # 'sound' (arquivo) ou 'sequence' (macro: lista de {'sound_id', 'offset_ms', 'gain'})
+    kind: str = 'sound'
+    steps: Optional[List[Dict[str, Any]]] = None
 
 
 class SoundManager:
@@ -78,6 +85,44 @@ class SoundManager:
                 break
         self.save()
 
+    def add_sequence(self, name, steps):
+        entry = SoundEntry(id=str(uuid.uuid4()), name=name, path='', kind='sequence', steps=list(steps))
+        self.sounds.append(entry)
+        self.save()
+        return entry
+
+    def update_sequence(self, sound_id, name, steps):
+        s = self.get(sound_id)
+        if s is not None and s.kind == 'sequence':
+            s.name = name
+            s.steps = list(steps)
+            self.save()
+
+    def get(self, sound_id) -> Optional[SoundEntry]:
+        for s in self.sounds:
+            if s.id == sound_id:
+                return s
+        return None
+
+    def resolve_sequence(self, entry: SoundEntry) -> List[Tuple[str, float, float]]:
+        """
+        Converte os passos de uma sequência em (caminho, offset_ms, ganho).
+        O ganho do passo é multiplicado pelo volume do som referenciado;
+        passos que apontam para sons removidos são ignorados.
+        """
+        out = []
+        for step in entry.steps or []:
+            ref = self.get(step.get('sound_id'))
+            if ref is None or ref.kind != 'sound':
+                continue
+            out.append((ref.path, float(step.get('offset_ms', 0.0)), float(step.get('gain', 1.0)) * ref.volume))
+        return out
+
+    def paths_for(self, entry: SoundEntry) -> List[str]:
+        if entry.kind == 'sequence':
+            return [p for p, _, _ in self.resolve_sequence(entry)]
+        return [entry.path]
+
     def move(self, from_idx, to_idx):
         if 0 <= from_idx < len(self.sounds) and 0 <= to_idx < len(self.sounds):
             s = self.sounds.pop(from_idx)
@@ -113,17 +158,667 @@ class PlayerThread(threading.Thread):
         self._stop.set()
 
 
+def load_audio(filepath):
+    """
+    Decodifica um arquivo para float32 estéreo em -1..1.
+    Usa soundfile se possível; fallback para pydub nos formatos "m4a/mp3/webm".
+    Retorna (data, sr) ou (None, None) se falhar.
+    """
+    try:
+        data, sr = sf.read(filepath, dtype='float32')
+        # sf.read com dtype='float32' geralmente retorna float32 em -1..1
+        if data.ndim == 1:
+            data = np.column_stack((data, data))
+        return data, sr
+    except Exception:
+        if AudioSegment is None:
+            print("Erro: formato não suportado e pydub ausente. Instale pydub e ffmpeg.")
+            return None, None
+    try:
+        audio = AudioSegment.from_file(filepath)
+        audio = audio.set_frame_rate(DEFAULT_SAMPLE_RATE).set_channels(2)
+        # extrai samples e normaliza para float32 em -1..1
+        samples = np.array(audio.get_array_of_samples())
+        samples = samples.astype(np.float32)
+        # sample_width em bytes (1,2,4). normalizar conforme largura
+        if audio.sample_width == 1:
+            # 8-bit unsigned PCM in pydub -> shift to signed
+            samples = (samples - 128.0) / 128.0
+        elif audio.sample_width == 2:
+            samples = samples / (2**15)
+        elif audio.sample_width == 4:
+            samples = samples / (2**31)
+        else:
+            # fallback: tente dividir por 2^(8*sample_width -1)
+            samples = samples / float(2**(8*audio.sample_width - 1))
+        samples = samples.reshape((-1, audio.channels))
+        data = samples.astype(np.float32)
+        if data.shape[1] == 1:
+            data = np.column_stack((data[:, 0], data[:, 0]))
+        return data, audio.frame_rate
+    except Exception as e:
+        print("Erro ao decodificar via pydub:", e)
+        return None, None
+
+
+def resample_audio(data, sr, target_sr, chunk=65536):
+    # Interpolação linear simples — suficiente para efeitos curtos do soundboard.
+    # Processa em blocos para não criar arrays auxiliares do tamanho do arquivo.
+    if sr == target_sr or data.shape[0] == 0:
+        return data.astype(np.float32, copy=False)
+    n_in = data.shape[0]
+    n_out = int(round(n_in * float(target_sr) / float(sr)))
+    step = (n_in - 1) / float(max(n_out - 1, 1))
+    out = np.empty((n_out, data.shape[1]), dtype=np.float32)
+    for start in range(0, n_out, chunk):
+        pos = np.arange(start, min(start + chunk, n_out)) * step
+        i0 = pos.astype(np.int64)
+        i1 = np.minimum(i0 + 1, n_in - 1)
+        frac = (pos - i0).astype(np.float32)[:, None]
+        out[start:start + pos.shape[0]] = data[i0] * (1.0 - frac) + data[i1] * frac
+    return out
+
+
+class JitterBuffer:
+    """
+    Buffer circular pequeno para o microfone. Só começa a entregar amostras depois
+    de acumular `target_frames`; em caso de falta (underrun) entrega silêncio e
+    volta a acumular antes de liberar o áudio de novo.
+    """
+    def __init__(self, target_frames, channels, capacity_frames=None):
+        self.target = max(0, int(target_frames))
+        self.capacity = int(capacity_frames or max(self.target * 4, 1024))
+        self.buf = np.zeros((self.capacity, channels), dtype=np.float32)
+        self.read_pos = 0
+        self.fill = 0
+        self.primed = self.target == 0
+
+    def clear(self):
+        self.read_pos = 0
+        self.fill = 0
+        self.primed = self.target == 0
+
+    def push(self, block):
+        n = block.shape[0]
+        if n > self.capacity:
+            block = block[-self.capacity:]
+            n = self.capacity
+        # Descarta o mais antigo se estourar (mantém a latência limitada)
+        overflow = self.fill + n - self.capacity
+        if overflow > 0:
+            self.read_pos = (self.read_pos + overflow) % self.capacity
+            self.fill -= overflow
+        w = (self.read_pos + self.fill) % self.capacity
+        first = min(n, self.capacity - w)
+        self.buf[w:w + first] = block[:first]
+        self.buf[:n - first] = block[first:]
+        self.fill += n
+        if self.fill >= self.target:
+            self.primed = True
+
+    def pull(self, out):
+        """Preenche `out` e retorna quantos frames reais foram copiados (o resto fica em silêncio)."""
+        out.fill(0)
+        if not self.primed:
+            return 0
+        n = min(out.shape[0], self.fill)
+        first = min(n, self.capacity - self.read_pos)
+        out[:first] = self.buf[self.read_pos:self.read_pos + first]
+        out[first:n] = self.buf[:n - first]
+        self.read_pos = (self.read_pos + n) % self.capacity
+        self.fill -= n
+        if n < out.shape[0]:
+            self.primed = self.target == 0
+        return n
+
+
+class Voice:
+    def __init__(self, data, gain, delay=0):
+        self.data = data
+        self.gain = gain
+        self.pos = 0
+        self.delay = delay  # frames de silêncio antes de começar (sequências)
+
+
+class AudioCache:
+    """
+    Cache LRU de áudio decodificado (saída de load_audio), limitado por memória.
+    As entradas ficam na taxa original do arquivo (a reprodução normal não é
+    reamostrada); o MixerEngine pede cópias na taxa dele, guardadas sob uma
+    chave própria só quando a taxa é diferente. Decodificações em andamento
+    ficam em `pending`: quem pedir o mesmo arquivo espera a mesma carga em vez
+    de decodificar de novo.
+
+    A taxa de acerto é contada por disparo do usuário (`record_trigger`);
+    `prefetch_hits` conta só os disparos servidos por entradas que o Prefetcher
+    aqueceu em segundo plano, que é o número usado para ajustar PREFETCH_TOP_N.
+    """
+    def __init__(self, budget_bytes=CACHE_BUDGET_MB * 1024 * 1024):
+        self.budget = budget_bytes
+        self.entries = collections.OrderedDict()  # (path, samplerate ou None) -> (data, sr)
+        self.native_rates: Dict[str, int] = {}  # taxa original dos arquivos já decodificados
+        self.sizes: Dict[Tuple[str, Optional[int]], int] = {}  # bytes das chaves já decodificadas
+        self.failed = set()  # arquivos que não decodificaram
+        self.pending: Dict[Tuple[str, Optional[int]], list] = {}  # chave -> [Event, (data, sr)]
+        self.prefetched = set()  # chaves aquecidas pelo Prefetcher e ainda não usadas
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.prefetch_hits = 0
+        self.lock = threading.Lock()
+
+    def _key(self, filepath, samplerate):
+        # Se o arquivo já está na taxa pedida, a cópia do motor é a própria entrada original
+        if samplerate is not None and self.native_rates.get(filepath) == samplerate:
+            samplerate = None
+        return (filepath, samplerate)
+
+    def key(self, filepath, samplerate=None):
+        with self.lock:
+            return self._key(filepath, samplerate)
+
+    def _store(self, key, data, sr, prefetched):
+        data.setflags(write=False)  # compartilhado entre reproduções
+        with self.lock:
+            self.sizes[key] = data.nbytes
+            self.failed.discard(key[0])
+            if data.nbytes > self.budget or key in self.entries:
+                return
+            self.entries[key] = (data, sr)
+            self.used += data.nbytes
+            if prefetched:
+                self.prefetched.add(key)
+            while self.used > self.budget and self.entries:
+                old_key, (old, _) = self.entries.popitem(last=False)
+                self.used -= old.nbytes
+                self.prefetched.discard(old_key)
+
+    def get(self, filepath, samplerate=None, prefetched=False):
+        """Retorna (data, sr); com `samplerate`, o áudio vem reamostrado para essa taxa."""
+        with self.lock:
+            key = self._key(filepath, samplerate)
+            item = self.entries.get(key)
+            if item is not None:
+                self.entries.move_to_end(key)
+                return item
+            slot = self.pending.get(key)
+            owner = slot is None
+            if owner:
+                slot = self.pending[key] = [threading.Event(), (None, None)]
+        if not owner:
+            # Outra thread (ex: o Prefetcher) já está carregando esta chave
+            slot[0].wait()
+            return slot[1]
+        try:
+            if key[1] is None:
+                data, sr = load_audio(filepath)
+                if data is not None and sr is not None:
+                    with self.lock:
+                        self.native_rates[filepath] = sr
+                    self._store(key, data, sr, prefetched)
+            else:
+                data, sr = self.get(filepath, prefetched=prefetched)
+                if data is not None and sr is not None and sr != key[1]:
+                    data, sr = resample_audio(data, sr, key[1]), key[1]
+                    self._store(key, data, sr, prefetched)
+            if data is None or sr is None:
+                with self.lock:
+                    self.failed.add(filepath)
+            slot[1] = (data, sr)
+            return data, sr
+        finally:
+            with self.lock:
+                self.pending.pop(key, None)
+            slot[0].set()
+
+    def warm(self, filepath, samplerate=None, prefetched=False):
+        self.get(filepath, samplerate, prefetched)
+
+    def contains(self, filepath, samplerate=None):
+        with self.lock:
+            return self._key(filepath, samplerate) in self.entries
+
+    def has_failed(self, filepath):
+        with self.lock:
+            return filepath in self.failed
+
+    def free_bytes(self):
+        with self.lock:
+            return self.budget - self.used
+
+    def _estimate(self, filepath, samplerate):
+        key = (filepath, samplerate)
+        if key in self.sizes:
+            return self.sizes[key]
+        try:
+            info = sf.info(filepath)
+            frames = info.frames * float(samplerate or info.samplerate) / float(info.samplerate)
+        except Exception:
+            # formatos comprimidos (via pydub, 48 kHz): estimativa pelo tamanho do arquivo (~128 kbps)
+            try:
+                frames = os.path.getsize(filepath) / 16000.0 * (samplerate or DEFAULT_SAMPLE_RATE)
+            except OSError:
+                return 0
+        return int(frames) * 2 * 4  # estéreo float32
+
+    def estimate_bytes(self, filepath, samplerate=None):
+        """Memória (conhecida ou estimada) para deixar a chave pronta, incluindo a cópia original se faltar."""
+        with self.lock:
+            key = self._key(filepath, samplerate)
+            native_cached = (filepath, None) in self.entries
+        size = self._estimate(filepath, key[1])
+        if key[1] is not None and not native_cached:
+            size += self._estimate(filepath, None)
+        return size
+
+    def record_trigger(self, keys):
+        """
+        Conta um disparo do usuário (`keys` vindas de `key`). Só é acerto se tudo
+        já estava decodificado; carga em andamento conta como falha (o usuário espera).
+        Disparos sem arquivos (sequência vazia) são ignorados.
+        """
+        if not keys:
+            return
+        with self.lock:
+            if all(k in self.entries for k in keys):
+                self.hits += 1
+                if all(k in self.prefetched for k in keys):
+                    self.prefetch_hits += 1
+            else:
+                self.misses += 1
+            self.prefetched.difference_update(keys)
+
+    def prefetch_hit_rate(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return (self.prefetch_hits / total) if total else 0.0
+
+    def hit_rate(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return (self.hits / total) if total else 0.0
+
+
+class Prefetcher(threading.Thread):
+    """
+    Aquece o AudioCache em segundo plano com os `top_n` sons mais prováveis
+    (uso, recência e atalho registrado nesta sessão). Roda na inicialização,
+    quando fica ocioso e, com prioridade, para o som selecionado na lista.
+    Com o modo duplex ligado, `samplerate` é a taxa do MixerEngine e o
+    aquecimento prepara as cópias nessa taxa.
+    """
+    PRIORITY_SELECTED = 0
+    PRIORITY_BACKGROUND = 1
+
+    def __init__(self, cache: AudioCache, manager: 'SoundManager', top_n=PREFETCH_TOP_N,
+                 idle_seconds=PREFETCH_IDLE_SECONDS):
+        super().__init__(daemon=True)
+        self.cache = cache
+        self.manager = manager
+        self.top_n = top_n
+        self.idle_seconds = idle_seconds
+        self.samplerate: Optional[int] = None
+        self.registered_ids = set()  # sons com atalho ativo no `keyboard`
+        self.q = queue.PriorityQueue()
+        self._seq = 0
+        self._seq_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def score(self, s: SoundEntry, now):
+        sc = float(s.usage_count)
+        if s.last_used:
+            # recência: meia-vida de 1 dia
+            age_hours = max(0.0, now - s.last_used) / 3600.0
+            sc += 10.0 * 0.5 ** (age_hours / 24.0)
+        # Atalhos salvos não são registrados de novo ao abrir o app: só conta o que está ativo
+        if s.id in self.registered_ids:
+            sc += 5.0
+        return sc
+
+    def likely_sounds(self) -> List[SoundEntry]:
+        now = QtCore.QDateTime.currentSecsSinceEpoch()
+        scored = [(self.score(s, now), s) for s in list(self.manager.sounds)]
+        # Sem nenhum sinal de uso não há o que prever
+        ranked = sorted([x for x in scored if x[0] > 0], key=lambda x: -x[0])
+        return [s for _, s in ranked[:self.top_n]]
+
+    def _put(self, priority, filepath, samplerate=None):
+        with self._seq_lock:
+            self._seq += 1
+            seq = self._seq
+        self.q.put((priority, seq, filepath, samplerate))
+
+    def rate_for(self, s: SoundEntry):
+        # Sequências são sempre mixadas pelo MixerEngine, mesmo fora do modo duplex
+        if s.kind == 'sequence':
+            return self.samplerate or DEFAULT_SAMPLE_RATE
+        return self.samplerate
+
+    def warm(self, s: SoundEntry):
+        rate = self.rate_for(s)
+        for path in self.manager.paths_for(s):
+            self._put(self.PRIORITY_SELECTED, path, rate)
+
+    def warm_top(self):
+        # Planeja dentro do espaço livre do cache: o aquecimento em segundo plano nunca
+        # despeja nada (nem sons tocados recentemente), então não entra em ciclo de
+        # despejar/decodificar de novo a cada passada ociosa
+        free = self.cache.free_bytes()
+        plan = []
+        seen = set()
+        for s in self.likely_sounds():
+            rate = self.rate_for(s)
+            for path in self.manager.paths_for(s):
+                if (path, rate) in seen or self.cache.has_failed(path):
+                    continue
+                seen.add((path, rate))
+                if self.cache.contains(path, rate):
+                    continue
+                size = self.cache.estimate_bytes(path, rate)
+                if size > free:
+                    continue
+                free -= size
+                plan.append((path, rate))
+        # O mais provável por último: fica como o mais recente no LRU
+        for path, rate in reversed(plan):
+            self._put(self.PRIORITY_BACKGROUND, path, rate)
+
+    def run(self):
+        # Primeira passada aqui (e não na thread da interface): a estimativa lê os arquivos
+        self.warm_top()
+        while not self._stop.is_set():
+            try:
+                priority, _, filepath, samplerate = self.q.get(timeout=self.idle_seconds)
+            except queue.Empty:
+                self.warm_top()
+                continue
+            if filepath is None:
+                continue
+            try:
+                self.cache.warm(filepath, samplerate, prefetched=priority == self.PRIORITY_BACKGROUND)
+            except Exception as e:
+                print('Prefetch error:', e)
+
+    def stop(self):
+        self._stop.set()
+        self._put(-1, None)  # acorda a thread
+
+
+class MixerEngine:
+    """
+    Modo duplex: abre o microfone e mistura com os sons ativos do soundboard no
+    mesmo callback, escrevendo o resultado direto no cabo virtual selecionado
+    (dispensa o VoiceMeeter).
+
+    `render` só trabalha com arrays numpy; `stream_factory` pode ser trocado por
+    um backend simulado para exercitar o callback sem hardware.
+    """
+    def __init__(self, samplerate=DEFAULT_SAMPLE_RATE, channels=2, blocksize=256,
+                 jitter_blocks=2, stream_factory=None, cache: Optional[AudioCache] = None):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.blocksize = blocksize
+        self.stream_factory = stream_factory or sd.Stream
+        self.cache = cache
+        self.stream = None
+        self.input_device: Optional[int] = None
+        self.output_device: Optional[int] = None
+
+        self.master_volume = 1.0
+        self.mic_gain = 1.0
+        self.duck_enabled = False
+        self.duck_level = 0.3  # ganho do microfone enquanto um som toca
+
+        self.voices: List[Voice] = []
+        self.voices_lock = threading.Lock()
+        self.jitter = JitterBuffer(blocksize * jitter_blocks, channels)
+        self._mic_block = np.zeros((blocksize * 4, channels), dtype=np.float32)
+        self._duck_gain = 1.0
+
+    def is_running(self):
+        return self.stream is not None
+
+    def start(self, input_device, output_device):
+        self.stop()
+        self.input_device = input_device
+        self.output_device = output_device
+        self.jitter.clear()
+        self._duck_gain = 1.0
+        stream = self.stream_factory(
+            samplerate=self.samplerate,
+            blocksize=self.blocksize,
+            device=(input_device, output_device),
+            channels=(1, self.channels),
+            dtype='float32',
+            latency='low',
+            callback=self.render)
+        stream.start()
+        self.stream = stream
+
+    def stop(self):
+        stream, self.stream = self.stream, None
+        if stream is not None:
+            try:
+                stream.stop()
+            except Exception:
+                pass
+            try:
+                stream.close()
+            except Exception:
+                pass
+        self.stop_voices()
+
+    def _prepare(self, data, sr):
+        data = resample_audio(data, sr, self.samplerate)
+        if data.shape[1] != self.channels:
+            data = np.repeat(data[:, :1], self.channels, axis=1)
+        return data
+
+    def _load(self, filepath):
+        data, sr = self.cache.get(filepath, self.samplerate) if self.cache is not None else load_audio(filepath)
+        if data is None or sr is None:
+            print('Não foi possível carregar o arquivo:', filepath)
+        return data, sr
+
+    def play(self, data, sr, volume):
+        """Adiciona um som já decodificado à mixagem (pode ser chamado de qualquer thread)."""
+        data = self._prepare(data, sr)
+        with self.voices_lock:
+            self.voices.append(Voice(data, float(volume)))
+
+    def play_file(self, filepath, volume):
+        data, sr = self._load(filepath)
+        if data is None or sr is None:
+            return
+        self.play(data, sr, volume)
+
+    def sequence_voices(self, steps, volume) -> List[Voice]:
+        """
+        Decodifica os passos (caminho, offset_ms, ganho) de uma sequência e devolve
+        as vozes com o atraso já convertido para frames na taxa do motor.
+        """
+        voices = []
+        for filepath, offset_ms, gain in steps:
+            data, sr = self._load(filepath)
+            if data is None or sr is None:
+                continue
+            delay = int(round(max(0.0, offset_ms) * self.samplerate / 1000.0))
+            voices.append(Voice(self._prepare(data, sr), float(gain) * float(volume), delay))
+        return voices
+
+    def play_sequence(self, steps, volume):
+        # Todas as vozes entram no mesmo bloco; os offsets são contados em frames dentro do render
+        voices = self.sequence_voices(steps, volume)
+        with self.voices_lock:
+            self.voices.extend(voices)
+
+    def render_sequence(self, steps, volume):
+        """Mixdown offline de uma sequência (usado fora do modo duplex). Retorna (data, sr)."""
+        voices = self.sequence_voices(steps, volume)
+        n = max([v.delay + v.data.shape[0] for v in voices] or [0])
+        out = np.zeros((n, self.channels), dtype=np.float32)
+        self._mix_voices(voices, out, n)
+        return out, self.samplerate
+
+    def stop_voices(self):
+        with self.voices_lock:
+            self.voices = []
+
+    def render(self, indata, outdata, frames, time_info=None, status=None):
+        outdata.fill(0)
+
+        # Sons do soundboard
+        with self.voices_lock:
+            self.voices, sound_active = self._mix_voices(self.voices, outdata, frames)
+        outdata *= self.master_volume
+
+        # Microfone (passa pelo jitter buffer; ducking com rampa por bloco para evitar cliques)
+        if indata is not None:
+            if indata.shape[1] == self.channels:
+                self.jitter.push(indata)
+            else:
+                self.jitter.push(np.repeat(indata[:, :1], self.channels, axis=1))
+            if self._mic_block.shape[0] < frames:
+                self._mic_block = np.zeros((frames, self.channels), dtype=np.float32)
+            mic = self._mic_block[:frames]
+            self.jitter.pull(mic)
+            target = self.duck_level if (self.duck_enabled and sound_active) else 1.0
+            ramp = np.linspace(self._duck_gain, target, frames, dtype=np.float32)[:, None]
+            self._duck_gain = target
+            outdata += mic * ramp * self.mic_gain
+
+        np.clip(outdata, -1.0, 1.0, out=outdata)
+
+    @staticmethod
+    def _mix_voices(voices, outdata, frames):
+        """Soma as vozes no bloco respeitando o atraso de cada uma. Retorna (vozes vivas, houve som)."""
+        sound_active = False
+        alive = []
+        for v in voices:
+            if v.delay >= frames:
+                v.delay -= frames
+                alive.append(v)
+                continue
+            start, v.delay = v.delay, 0
+            n = min(frames - start, v.data.shape[0] - v.pos)
+            if n > 0:
+                outdata[start:start + n] += v.data[v.pos:v.pos + n] * v.gain
+                v.pos += n
+                sound_active = True
+            if v.pos < v.data.shape[0]:
+                alive.append(v)
+        return alive, sound_active
+
+
+class SequenceDialog(QtWidgets.QDialog):
+    """Editor de sequência: lista ordenada de (som, offset em ms, ganho)."""
+    def __init__(self, parent, sounds: List[SoundEntry], entry: Optional[SoundEntry] = None):
+        super().__init__(parent)
+        self.setWindowTitle('Sequência')
+        self.resize(520, 360)
+        self.sounds = [s for s in sounds if s.kind == 'sound']
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(QtWidgets.QLabel('Nome'))
+        self.name_edit = QtWidgets.QLineEdit(entry.name if entry else 'Nova sequência')
+        layout.addWidget(self.name_edit)
+
+        self.table = QtWidgets.QTableWidget(0, 3)
+        self.table.setHorizontalHeaderLabels(['Som', 'Offset (ms)', 'Ganho'])
+        self.table.horizontalHeader().setSectionResizeMode(0, QtWidgets.QHeaderView.Stretch)
+        layout.addWidget(self.table)
+
+        row_btns = QtWidgets.QHBoxLayout()
+        add_btn = QtWidgets.QPushButton('Adicionar passo')
+        add_btn.clicked.connect(lambda: self.add_row())
+        row_btns.addWidget(add_btn)
+        del_btn = QtWidgets.QPushButton('Remover passo')
+        del_btn.clicked.connect(self.remove_row)
+        row_btns.addWidget(del_btn)
+        row_btns.addStretch()
+        layout.addLayout(row_btns)
+
+        buttons = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Ok | QtWidgets.QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+        for step in (entry.steps or []) if entry else []:
+            self.add_row(step)
+
+    def add_row(self, step=None):
+        step = step or {}
+        r = self.table.rowCount()
+        self.table.insertRow(r)
+        combo = QtWidgets.QComboBox()
+        for s in self.sounds:
+            combo.addItem(s.name, s.id)
+        pos = combo.findData(step.get('sound_id'))
+        if pos < 0 and step.get('sound_id'):
+            # Som removido: sem dados, get_steps descarta o passo em vez de trocar pelo primeiro som
+            combo.insertItem(0, '(som removido)', None)
+            pos = 0
+        if pos >= 0:
+            combo.setCurrentIndex(pos)
+        self.table.setCellWidget(r, 0, combo)
+        offset = QtWidgets.QSpinBox()
+        offset.setRange(0, 600000)
+        offset.setSuffix(' ms')
+        offset.setValue(int(step.get('offset_ms', 0)))
+        self.table.setCellWidget(r, 1, offset)
+        gain = QtWidgets.QDoubleSpinBox()
+        gain.setRange(0.0, 2.0)
+        gain.setSingleStep(0.05)
+        gain.setValue(float(step.get('gain', 1.0)))
+        self.table.setCellWidget(r, 2, gain)
+
+    def remove_row(self):
+        r = self.table.currentRow()
+        if r >= 0:
+            self.table.removeRow(r)
+
+    def get_name(self):
+        return self.name_edit.text().strip()
+
+    def get_steps(self):
+        steps = []
+        for r in range(self.table.rowCount()):
+            sid = self.table.cellWidget(r, 0).currentData()
+            if sid is None:
+                continue
+            steps.append({
+                'sound_id': sid,
+                'offset_ms': self.table.cellWidget(r, 1).value(),
+                'gain': self.table.cellWidget(r, 2).value(),
+            })
+        return steps
+
+
 class SoundPadUI(QtWidgets.QMainWindow):
+    # Emitido pela thread do `keyboard`; tratado na thread da interface (não espera o PlayerThread)
+    hotkey_triggered = QtCore.pyqtSignal(str)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle('SoundPad - PyQt5')
         self.resize(1000, 640)
+        self.hotkey_triggered.connect(self.on_hotkey_triggered, Qt.ConnectionType.QueuedConnection)
+        self.devices: List[Any] = []  # resultado de sd.query_devices()
+        self.hostapi_names: List[str] = []
 
         self.manager = SoundManager()
         self.player = PlayerThread()
         self.player.start()
+        # Disparos do MixerEngine têm fila própria: não esperam a reprodução bloqueante do monitor
+        self.engine_player = PlayerThread()
+        self.engine_player.start()
+
+        self.cache = AudioCache()
+        self.prefetcher = Prefetcher(self.cache, self.manager)
+        self.prefetcher.start()
 
         self.master_volume = 1.0
+        self.engine = MixerEngine(cache=self.cache)  # modo duplex (microfone + sons no mesmo callback)
         self.current_streams: List[Any] = []  # Objetos OutputStream ativos no momento
 
         # sincronização / sinal de parada
@@ -134,6 +829,11 @@ class SoundPadUI(QtWidgets.QMainWindow):
         self.populate_devices()
         self.refresh_sound_list()
 
+        # Atualiza a taxa de acerto do cache (para ajustar PREFETCH_TOP_N)
+        self.cache_timer = QtCore.QTimer(self)
+        self.cache_timer.timeout.connect(self.update_cache_status)
+        self.cache_timer.start(2000)
+
     def init_ui(self):
         w = QtWidgets.QWidget()
         self.setCentralWidget(w)
@@ -147,6 +847,10 @@ class SoundPadUI(QtWidgets.QMainWindow):
         self.add_btn.clicked.connect(self.add_sound)
         top.addWidget(self.add_btn)
 
+        self.add_seq_btn = QtWidgets.QPushButton('Nova sequência')
+        self.add_seq_btn.clicked.connect(self.on_new_sequence)
+        top.addWidget(self.add_seq_btn)
+
         self.sort_combo = QtWidgets.QComboBox()
         self.sort_combo.addItems(['Tempo: Antigo→Novo','Alfabética', 'Mais usados'])
         self.sort_combo.currentIndexChanged.connect(self.apply_sort)
@@ -183,10 +887,35 @@ class SoundPadUI(QtWidgets.QMainWindow):
         self.refresh_devices_btn.clicked.connect(self.populate_devices)
         dev_layout.addWidget(self.refresh_devices_btn)
 
+        # Esquerda: microfone (modo duplex, substitui o VoiceMeeter)
+        mic_box = QtWidgets.QGroupBox('Microfone (modo duplex)')
+        mic_layout = QtWidgets.QVBoxLayout(mic_box)
+        self.duplex_checkbox = QtWidgets.QCheckBox('Mixar microfone no cabo')
+        self.duplex_checkbox.toggled.connect(self.on_duplex_toggled)
+        mic_layout.addWidget(self.duplex_checkbox)
+        mic_layout.addWidget(QtWidgets.QLabel('Entrada (microfone)'))
+        self.mic_combo = QtWidgets.QComboBox()
+        self.mic_combo.currentIndexChanged.connect(self.on_mic_changed)
+        mic_layout.addWidget(self.mic_combo)
+        mic_layout.addWidget(QtWidgets.QLabel('Saída (cabo virtual)'))
+        self.cable_combo = QtWidgets.QComboBox()
+        self.cable_combo.currentIndexChanged.connect(self.on_duplex_devices_changed)
+        mic_layout.addWidget(self.cable_combo)
+        mic_layout.addWidget(QtWidgets.QLabel('Ganho do microfone'))
+        self.mic_gain_slider = QtWidgets.QSlider(Qt.Orientation.Horizontal)
+        self.mic_gain_slider.setRange(0, 200)
+        self.mic_gain_slider.setValue(100)
+        self.mic_gain_slider.valueChanged.connect(self.on_mic_gain)
+        mic_layout.addWidget(self.mic_gain_slider)
+        self.duck_checkbox = QtWidgets.QCheckBox('Abaixar microfone durante sons')
+        self.duck_checkbox.toggled.connect(self.on_duck_toggled)
+        mic_layout.addWidget(self.duck_checkbox)
+
         dev_container = QtWidgets.QWidget()
         dc_layout = QtWidgets.QVBoxLayout(dev_container)
         dc_layout.setContentsMargins(0, 0, 0, 0)
         dc_layout.addWidget(dev_box)
+        dc_layout.addWidget(mic_box)
 
         # Centro: lista de sons
         self.sounds_widget = QtWidgets.QListWidget()
@@ -219,6 +948,10 @@ class SoundPadUI(QtWidgets.QMainWindow):
         self.delete_btn.clicked.connect(self.on_delete)
         rlayout.addWidget(self.delete_btn)
 
+        self.edit_seq_btn = QtWidgets.QPushButton('Editar sequência')
+        self.edit_seq_btn.clicked.connect(self.on_edit_sequence)
+        rlayout.addWidget(self.edit_seq_btn)
+
         rlayout.addWidget(QtWidgets.QLabel('Volume do som'))
         self.volume_slider = QtWidgets.QSlider(Qt.Orientation.Horizontal)
         self.volume_slider.setRange(0, 100)
@@ -256,7 +989,12 @@ class SoundPadUI(QtWidgets.QMainWindow):
         self.status = QtWidgets.QLabel('Pronto')
         self.status.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Fixed)
         self.status.setMinimumHeight(22)
-        layout.addWidget(self.status, stretch=0)
+        self.cache_status = QtWidgets.QLabel('')
+        self.cache_status.setAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        status_row = QtWidgets.QHBoxLayout()
+        status_row.addWidget(self.status, stretch=1)
+        status_row.addWidget(self.cache_status, stretch=0)
+        layout.addLayout(status_row, stretch=0)
 
         # Conexões de sinais
         self.sounds_widget.itemSelectionChanged.connect(self.on_selection_changed)
@@ -266,8 +1004,25 @@ class SoundPadUI(QtWidgets.QMainWindow):
     # Lista de dispositivos
     def populate_devices(self):
         self.devices_list.clear()
+        # Sem sinais enquanto recarrega; o motor é reaberto uma vez no final
+        self.mic_combo.blockSignals(True)
+        self.cable_combo.blockSignals(True)
+        self.mic_combo.clear()
+        self.cable_combo.clear()
         try:
             devs = sd.query_devices()
+            self.devices = list(devs)
+            try:
+                self.hostapi_names = [h.get('name', '') for h in sd.query_hostapis()]
+            except Exception:
+                self.hostapi_names = []
+            for idx, d in enumerate(devs):
+                if isinstance(d, dict) and d.get('max_input_channels', 0) > 0:
+                    self.mic_combo.addItem(self.device_label(idx), idx)
+            pos = self.mic_combo.findData(self.preferred_mic())
+            if pos >= 0:
+                self.mic_combo.setCurrentIndex(pos)
+            self.populate_cable_devices()
             for idx, d in enumerate(devs):
                 if isinstance(d, dict) and d.get('max_output_channels', 0) > 0:
                     item = QtWidgets.QListWidgetItem(f"{idx}: {d.get('name', 'Dispositivo')}")
@@ -279,12 +1034,71 @@ class SoundPadUI(QtWidgets.QMainWindow):
                         break
         except Exception as e:
             print("Device query failed:", e)
+        self.mic_combo.blockSignals(False)
+        self.cable_combo.blockSignals(False)
+        self.on_duplex_devices_changed()
+
+    def device_label(self, idx):
+        d = self.devices[idx]
+        api = d.get('hostapi')
+        api_name = self.hostapi_names[api] if isinstance(api, int) and 0 <= api < len(self.hostapi_names) else ''
+        return f"{idx}: {d.get('name', 'Dispositivo')}" + (f" ({api_name})" if api_name else '')
+
+    def preferred_mic(self):
+        # Microfone padrão, mas no WASAPI se houver o mesmo dispositivo lá (menor latência que o MME)
+        try:
+            dd = sd.default.device
+            default_in = dd[0] if isinstance(dd, (list, tuple)) else None
+        except Exception:
+            default_in = None
+        if default_in is None or not (0 <= default_in < len(self.devices)):
+            return default_in
+        # O MME corta nomes em 31 caracteres, por isso compara pelo prefixo
+        prefix = self.devices[default_in].get('name', '')[:31]
+        for idx, d in enumerate(self.devices):
+            api = d.get('hostapi')
+            if (d.get('max_input_channels', 0) > 0 and d.get('name', '').startswith(prefix)
+                    and isinstance(api, int) and api < len(self.hostapi_names)
+                    and 'WASAPI' in self.hostapi_names[api]):
+                return idx
+        return default_in
+
+    def populate_cable_devices(self):
+        # O stream duplex exige entrada e saída na mesma host API: só lista saídas da API do microfone
+        mic = self.mic_combo.currentData()
+        mic_api = self.devices[mic].get('hostapi') if mic is not None and 0 <= mic < len(self.devices) else None
+        previous = self.cable_combo.currentData()
+        self.cable_combo.blockSignals(True)
+        self.cable_combo.clear()
+        cable_pos = -1
+        for idx, d in enumerate(self.devices):
+            if not isinstance(d, dict) or d.get('max_output_channels', 0) <= 0:
+                continue
+            if mic_api is not None and d.get('hostapi') != mic_api:
+                continue
+            self.cable_combo.addItem(self.device_label(idx), idx)
+            # Seleciona o primeiro "cable" como saída do modo duplex
+            if cable_pos < 0 and "cable" in d.get('name', '').lower():
+                cable_pos = self.cable_combo.count() - 1
+        pos = self.cable_combo.findData(previous)
+        if pos < 0:
+            pos = cable_pos
+        if pos >= 0:
+            self.cable_combo.setCurrentIndex(pos)
+        self.cable_combo.blockSignals(False)
+
+    def on_mic_changed(self, *args):
+        self.populate_cable_devices()
+        self.on_duplex_devices_changed()
 
     # Lista de sons
     def refresh_sound_list(self):
         self.sounds_widget.clear()
         for s in self.manager.to_list():
-            it = QtWidgets.QListWidgetItem(f"{s.name}  [{os.path.basename(s.path)}]")
+            if s.kind == 'sequence':
+                it = QtWidgets.QListWidgetItem(f"{s.name}  [sequência: {len(self.manager.resolve_sequence(s))} passos]")
+            else:
+                it = QtWidgets.QListWidgetItem(f"{s.name}  [{os.path.basename(s.path)}]")
             it.setData(Qt.ItemDataRole.UserRole, s.id)
             self.sounds_widget.addItem(it)
 
@@ -360,11 +1174,60 @@ class SoundPadUI(QtWidgets.QMainWindow):
     def on_master_volume(self, v):
         # master slider usa 0..100 -> 0.0..1.0
         self.master_volume = v / 100.0
+        self.engine.master_volume = self.master_volume
+
+    def on_duplex_toggled(self, checked):
+        if not checked:
+            self.engine.stop()
+            self.prefetcher.samplerate = None
+            self.status.setText('Modo duplex desligado')
+            return
+        mic = self.mic_combo.currentData()
+        cable = self.cable_combo.currentData()
+        if mic is None or cable is None:
+            QtWidgets.QMessageBox.warning(self, 'Modo duplex', 'Selecione o microfone e a saída do cabo virtual (ex: CABLE Input).')
+            self.duplex_checkbox.setChecked(False)
+            return
+        try:
+            self.engine.start(mic, int(cable))
+            self.prefetcher.samplerate = self.engine.samplerate
+            self.status.setText(f'Modo duplex ativo: microfone {mic} -> dispositivo {cable}')
+        except Exception as e:
+            QtWidgets.QMessageBox.warning(self, 'Modo duplex', f'Não foi possível abrir o microfone/saída: {e}')
+            self.engine.stop()
+            self.duplex_checkbox.setChecked(False)
+
+    def on_duplex_devices_changed(self, *args):
+        # Reabre o motor com os dispositivos atuais se o modo duplex estiver ligado
+        if self.duplex_checkbox.isChecked():
+            self.on_duplex_toggled(True)
+
+    def on_mic_gain(self, v):
+        # slider 0..200 -> 0.0..2.0
+        self.engine.mic_gain = v / 100.0
+
+    def on_duck_toggled(self, checked):
+        self.engine.duck_enabled = bool(checked)
+
+    def update_cache_status(self):
+        c = self.cache
+        with c.lock:
+            hits, total, count, used = c.hits, c.hits + c.misses, len(c.entries), c.used
+        self.cache_status.setText(
+            f'Cache: {c.hit_rate():.0%} acertos ({hits}/{total}) · pré-carregados: {c.prefetch_hit_rate():.0%}'
+            f' · {count} entradas · {used / (1024 * 1024):.0f} MB')
+
+    def trigger_keys(self, s: SoundEntry, duplex):
+        # Chaves que o disparo vai usar: no modo duplex (e em sequências), as cópias na taxa do motor
+        rate = self.engine.samplerate if duplex or s.kind == 'sequence' else None
+        return [self.cache.key(p, rate) for p in self.manager.paths_for(s)]
 
     def on_selection_changed(self):
         s = self.get_selected_sound()
         if not s:
             return
+        # Aquece o som selecionado para que o próximo Play/duplo clique comece na hora
+        self.prefetcher.warm(s)
         self.volume_slider.setValue(int(s.volume * 100))
         self.hotkey_edit.setText(s.hotkey or '')
 
@@ -382,6 +1245,7 @@ class SoundPadUI(QtWidgets.QMainWindow):
         hk = self.hotkey_edit.text().strip()
         if not hk:
             s.hotkey = None
+            self.prefetcher.registered_ids.discard(s.id)
             self.manager.save()
             return
         if keyboard is None:
@@ -396,14 +1260,21 @@ class SoundPadUI(QtWidgets.QMainWindow):
 
         def on_hot():
             # Atalho dispara comportamento de duplo clique (reproduzir em dispositivos selecionados e monitorar se habilitado)
-            self.player.enqueue(self.handle_play_for_sound, s)
+            self.hotkey_triggered.emit(s.id)
         try:
             keyboard.add_hotkey(hk, on_hot)
+            self.prefetcher.registered_ids.add(s.id)
         except Exception as e:
             QtWidgets.QMessageBox.warning(self, 'Falha ao definir atalho', f'Não foi possível registrar o atalho: {e}')
             s.hotkey = None
+            self.prefetcher.registered_ids.discard(s.id)
         self.manager.save()
 
+    def on_hotkey_triggered(self, sid):
+        s = self.manager.get(sid)
+        if s is not None:
+            self.handle_play_for_sound(s)
+
     # Reproduzir, Parar, Testar, Funcionamento do duplo clique
 
     def get_selected_device_indices(self) -> List[Optional[int]]:
@@ -425,10 +1296,28 @@ class SoundPadUI(QtWidgets.QMainWindow):
             if not has_none:
                 dev_idxs = list(dev_idxs) + [None]
         # Passamos volume individual; play_to_devices aplicará também self.master_volume
-        self.player.enqueue(self.play_to_devices, s.path, s.volume, dev_idxs)
+        self.dispatch_play(s, dev_idxs)
         s.usage_count += 1
+        s.last_used = QtCore.QDateTime.currentSecsSinceEpoch()
         self.manager.save()
 
+    def dispatch_play(self, s: SoundEntry, dev_idxs):
+        # No modo duplex o cabo virtual é alimentado pelo MixerEngine; o resto segue pelo PlayerThread
+        self.cache.record_trigger(self.trigger_keys(s, self.engine.is_running()))
+        if s.kind == 'sequence':
+            steps = self.manager.resolve_sequence(s)
+            if self.engine.is_running():
+                dev_idxs = [d for d in dev_idxs if d != self.engine.output_device]
+                self.engine_player.enqueue(self.engine.play_sequence, steps, s.volume)
+            if dev_idxs:
+                self.player.enqueue(self.play_sequence_to_devices, steps, s.volume, dev_idxs)
+            return
+        if self.engine.is_running():
+            dev_idxs = [d for d in dev_idxs if d != self.engine.output_device]
+            self.engine_player.enqueue(self.engine.play_file, s.path, s.volume)
+        if dev_idxs:
+            self.player.enqueue(self.play_to_devices, s.path, s.volume, dev_idxs)
+
     def on_item_clicked(self, item):
         pass
 
@@ -454,8 +1343,9 @@ class SoundPadUI(QtWidgets.QMainWindow):
                     dev_idxs = list(dev_idxs) + [None]
             except Exception:
                 dev_idxs = list(dev_idxs) + [None]
-        self.player.enqueue(self.play_to_devices, s.path, s.volume, dev_idxs)
+        self.dispatch_play(s, dev_idxs)
         s.usage_count += 1
+        s.last_used = QtCore.QDateTime.currentSecsSinceEpoch()
         self.manager.save()
 
     def on_test(self):
@@ -467,6 +1357,10 @@ class SoundPadUI(QtWidgets.QMainWindow):
             dev_idxs = [default_dev[1]] if isinstance(default_dev, (list, tuple)) else [None]
         except:
             dev_idxs = [None]
+        self.cache.record_trigger(self.trigger_keys(s, False))
+        if s.kind == 'sequence':
+            self.player.enqueue(self.play_sequence_to_devices, self.manager.resolve_sequence(s), s.volume, dev_idxs)
+            return
         self.player.enqueue(self.play_to_devices, s.path, s.volume, dev_idxs)
 
     def on_stop(self):
@@ -476,8 +1370,37 @@ class SoundPadUI(QtWidgets.QMainWindow):
         e fechar os streams de maneira segura (na mesma thread que os criou).
         """
         self.stop_event.set()
+        self.engine.stop_voices()
         # Não chamar st.stop() ou st.close() aqui - evita crash nativo.
 
+    def on_new_sequence(self):
+        dlg = SequenceDialog(self, self.manager.sounds)
+        if dlg.exec_() != QtWidgets.QDialog.Accepted:
+            return
+        steps = dlg.get_steps()
+        if not steps:
+            self.status.setText('Sequência vazia não foi criada')
+            return
+        entry = self.manager.add_sequence(dlg.get_name() or 'Sequência', steps)
+        self.refresh_sound_list()
+        self.status.setText(f'Sequência criada: {entry.name}')
+
+    def on_edit_sequence(self):
+        s = self.get_selected_sound()
+        if not s or s.kind != 'sequence':
+            self.status.setText('Selecione uma sequência para editar')
+            return
+        dlg = SequenceDialog(self, self.manager.sounds, s)
+        if dlg.exec_() != QtWidgets.QDialog.Accepted:
+            return
+        steps = dlg.get_steps()
+        if not steps:
+            self.status.setText('Sequência vazia não foi salva')
+            return
+        self.manager.update_sequence(s.id, dlg.get_name() or s.name, steps)
+        self.refresh_sound_list()
+        self.status.setText(f'Sequência atualizada: {s.name}')
+
     def on_rename(self):
         s = self.get_selected_sound()
         if not s:
@@ -495,10 +1418,19 @@ class SoundPadUI(QtWidgets.QMainWindow):
         self.refresh_sound_list()
 
     ##### Núcleo de reprodução com suporte a "m4a" e interrupção #####
-    def play_to_devices(self, filepath, volume_individual, device_idxs):
+    def play_sequence_to_devices(self, steps, volume_individual, device_idxs):
+        # Fora do modo duplex a sequência é mixada pelo MixerEngine (offsets exatos em amostras)
+        # e tocada como um único buffer
+        data, sr = self.engine.render_sequence(steps, volume_individual)
+        if data.shape[0] == 0:
+            return
+        self.play_to_devices(None, 1.0, device_idxs, audio=(data, sr))
+
+    def play_to_devices(self, filepath, volume_individual, device_idxs, audio=None):
         """
         volume_individual: 0.0..1.0 (o slider do som)
         Aplicamos também self.master_volume (0.0..1.0) ao tocar.
+        audio: (data, sr) já decodificado; se presente, filepath é ignorado.
         """
 
         # limpa pedido anterior de parada
@@ -519,43 +1451,7 @@ class SoundPadUI(QtWidgets.QMainWindow):
                 pass
 
         # Lê arquivos (soundfile se possível; fallback para pydub para formatos "m4a/mp3/webm")
-        data = None
-        sr = None
-        try:
-            data, sr = sf.read(filepath, dtype='float32')
-            # sf.read com dtype='float32' geralmente retorna float32 em -1..1
-            if data.ndim == 1:
-                data = np.column_stack((data, data))
-        except Exception:
-            if AudioSegment is None:
-                print("Erro: formato não suportado e pydub ausente. Instale pydub e ffmpeg.")
-                return
-            try:
-                audio = AudioSegment.from_file(filepath)
-                audio = audio.set_frame_rate(DEFAULT_SAMPLE_RATE).set_channels(2)
-                # extrai samples e normaliza para float32 em -1..1
-                samples = np.array(audio.get_array_of_samples())
-                samples = samples.astype(np.float32)
-                # sample_width em bytes (1,2,4). normalizar conforme largura
-                if audio.sample_width == 1:
-                    # 8-bit unsigned PCM in pydub -> shift to signed
-                    samples = (samples - 128.0) / 128.0
-                elif audio.sample_width == 2:
-                    samples = samples / (2**15)
-                elif audio.sample_width == 4:
-                    samples = samples / (2**31)
-                else:
-                    # fallback: tente dividir por 2^(8*sample_width -1)
-                    samples = samples / float(2**(8*audio.sample_width - 1))
-                channels = audio.channels
-                samples = samples.reshape((-1, channels))
-                data = samples.astype(np.float32)
-                sr = audio.frame_rate
-                if data.ndim == 1:
-                    data = np.column_stack((data, data))
-            except Exception as e:
-                print("Erro ao decodificar via pydub:", e)
-                return
+        data, sr = audio if audio is not None else self.cache.get(filepath)
 
         # Se nada carregado, aborta
         if data is None or sr is None:
@@ -662,30 +1558,9 @@ class SoundPadUI(QtWidgets.QMainWindow):
             self.stop_event.clear()
 
     def play_file(self, filepath, volume):
-        try:
-            data, sr = sf.read(filepath, dtype='float32')
-            if data.ndim == 1:
-                data = np.column_stack((data, data))
-        except Exception:
-            if AudioSegment is None:
-                print("Erro: formato não suportado e pydub ausente.")
-                return
-            try:
-                audio = AudioSegment.from_file(filepath)
-                audio = audio.set_frame_rate(DEFAULT_SAMPLE_RATE).set_channels(2)
-                samples = np.array(audio.get_array_of_samples()).astype(np.float32)
-                if audio.sample_width == 1:
-                    samples = (samples - 128.0) / 128.0
-                elif audio.sample_width == 2:
-                    samples = samples / (2**15)
-                elif audio.sample_width == 4:
-                    samples = samples / (2**31)
-                samples = samples.reshape((-1, audio.channels))
-                data = samples
-                sr = audio.frame_rate
-            except Exception as e:
-                print("Erro ao decodificar via pydub:", e)
-                return
+        data, sr = self.cache.get(filepath)
+        if data is None or sr is None:
+            return
 
         # aplica volume final com master
         gain = float(volume) * float(self.master_volume)
@@ -709,7 +1584,10 @@ class SoundPadUI(QtWidgets.QMainWindow):
                 keyboard.unhook_all()
             except Exception:
                 pass
+        self.engine.stop()
+        self.prefetcher.stop()
         # finalize o player thread
+        self.engine_player.stop()
         self.player.stop()
         event.accept()
 
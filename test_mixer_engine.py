@@ -0,0 +1,76 @@
+import numpy as np
+
+from soundpad import MixerEngine, Voice
+
+
+class FakeStream:
+    """Backend simulado: guarda o callback do MixerEngine e roda um bloco por vez."""
+    def __init__(self, samplerate, blocksize, device, channels, dtype, latency, callback):
+        self.blocksize = blocksize
+        self.in_channels, self.out_channels = channels
+        self.callback = callback
+        self.started = False
+
+    def start(self):
+        self.started = True
+
+    def stop(self):
+        self.started = False
+
+    def close(self):
+        pass
+
+    def run_block(self, mic_value=0.0):
+        indata = np.full((self.blocksize, self.in_channels), mic_value, dtype=np.float32)
+        outdata = np.empty((self.blocksize, self.out_channels), dtype=np.float32)
+        self.callback(indata, outdata, self.blocksize, None, None)
+        return outdata
+
+
+def make_engine(blocksize=4, jitter_blocks=2):
+    streams = []
+
+    def factory(**kwargs):
+        streams.append(FakeStream(**kwargs))
+        return streams[-1]
+
+    engine = MixerEngine(blocksize=blocksize, jitter_blocks=jitter_blocks, stream_factory=factory)
+    engine.start(0, 1)
+    return engine, streams[0]
+
+
+def test_jitter_buffer_primes_with_silence_then_passes_mic_with_gain():
+    engine, stream = make_engine()
+    engine.mic_gain = 0.5
+    assert stream.started
+    # alvo = 2 blocos: o primeiro bloco ainda acumula e sai em silêncio
+    assert np.all(stream.run_block(0.4) == 0.0)
+    np.testing.assert_allclose(stream.run_block(0.4), 0.2, rtol=1e-6)
+    np.testing.assert_allclose(stream.run_block(0.4), 0.2, rtol=1e-6)
+
+
+def test_mic_is_ducked_with_ramp_while_voice_plays():
+    engine, stream = make_engine()
+    engine.duck_enabled = True
+    engine.duck_level = 0.25
+    stream.run_block(0.4)
+    stream.run_block(0.4)
+    # voz silenciosa: a saída é só o microfone, mas conta como som ativo
+    with engine.voices_lock:
+        engine.voices.append(Voice(np.zeros((32, 2), dtype=np.float32), 1.0))
+    out = stream.run_block(0.4)[:, 0]
+    expected = 0.4 * np.linspace(1.0, 0.25, 4, dtype=np.float32)
+    np.testing.assert_allclose(out, expected, rtol=1e-6)
+    np.testing.assert_allclose(stream.run_block(0.4), 0.1, rtol=1e-6)
+
+
+def test_voice_delay_is_sample_accurate_across_block_boundary():
+    engine, stream = make_engine(blocksize=4)
+    with engine.voices_lock:
+        engine.voices.append(Voice(np.full((3, 2), 0.5, dtype=np.float32), 1.0, delay=6))
+    out = np.concatenate([stream.run_block() for _ in range(3)])[:, 0]
+    nonzero = np.flatnonzero(out)
+    assert nonzero[0] == 6
+    np.testing.assert_allclose(out[6:9], 0.5)
+    assert np.all(out[:6] == 0.0) and np.all(out[9:] == 0.0)
+    assert engine.voices == []